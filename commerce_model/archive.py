@@ -0,0 +1,207 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+
+ARCHIVE_MAGIC = b'ECARCH03'
+ARCHIVE_ALIGNMENT = 64
+COLUMN_DTYPE = np.dtype('<f8')
+_FOOTER_TAIL = struct.Struct('<Q8s')
+
+
+def _index_dtype(model_type_width):
+    """ Return the run index dtype, model_type is stored with the width of the longest value. """
+    # 运行元数据索引，每个CommerceModel运行占一行
+    return np.dtype([
+        ('model_type', 'U%d' % model_type_width),
+        ('num_consumer_agents', '<i8'),
+        ('num_category_agents', '<i8'),
+        ('num_offline_retailer_agents', '<i8'),
+        ('num_online_retailer_agents', '<i8'),
+        ('num_platform_e_commerce_agents', '<i8'),
+        ('num_settled_shop_agents', '<i8'),
+        ('basket_size', '<i8'),
+        ('seed', '<i8'),
+        ('num_steps', '<i8'),
+    ])
+
+
+def _align(offset):
+    """ Round the offset up to the archive alignment. """
+    return (offset + ARCHIVE_ALIGNMENT - 1) // ARCHIVE_ALIGNMENT * ARCHIVE_ALIGNMENT
+
+
+def _index_value(value):
+    """ Store None and non-integer values (e.g. a non-integer Mesa seed) as -1 in the index. """
+    return int(value) if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else -1
+
+
+def _extract_row(model, seed, num_steps):
+    """ Return the index row of a finished CommerceModel run. """
+    return (model.model_type, model.num_consumer_agents, model.num_category_agents,
+            model.num_offline_retailer_agents, model.num_online_retailer_agents,
+            model.num_platform_e_commerce_agents, model.num_settled_shop_agents,
+            _index_value(getattr(model, 'basket_size', None)), _index_value(seed), num_steps)
+
+
+def write_archive(path, models, num_steps, seeds=None):
+    """ Write the DataCollector reporter series of many CommerceModel runs into a single archive file.
+
+    Every reporter is stored as a contiguous fixed-width column of shape (num_runs, num_steps),
+    runs shorter than num_steps are padded with NaN. While the runs arrive, each run's rows are
+    appended to one temporary section file per reporter and only the small index rows are kept in
+    memory, so models can be a generator which creates and runs one model at a time. The archive
+    is assembled in path + '.tmp' and replaces path only once it is complete.
+
+    Args:
+        path: 归档文件路径
+        models: 已运行完成的CommerceModel序列，可以是生成器
+        num_steps: 每个运行保存的最大步数，超过该步数的运行会引发ValueError
+        seeds: 可选的随机种子序列，长度必须与models相同；缺省时使用Mesa保存在模型上的种子，
+            没有种子时记为-1
+
+    """
+    if seeds is not None:
+        seeds = list(seeds)
+    tmp_path = path + '.tmp'
+    sections = []
+    try:
+        rows, reporters = _spool_runs(models, num_steps, seeds, sections, os.path.dirname(os.path.abspath(path)))
+        with open(tmp_path, 'wb') as f:
+            _assemble_archive(f, rows, reporters, num_steps, sections)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        for section in sections:
+            section.close()
+
+
+def _spool_runs(models, num_steps, seeds, sections, section_dir):
+    """ Append every run's reporter rows to the per-reporter section files, return the index rows and reporters. """
+    rows = []
+    reporters = None
+    record = np.empty(num_steps, dtype=COLUMN_DTYPE)
+    for i, model in enumerate(models):
+        if seeds is not None and i >= len(seeds):
+            raise ValueError("got more models than seeds (%d)" % len(seeds))
+        seed = seeds[i] if seeds is not None else getattr(model, '_seed', None)
+        model_vars = model.datacollector.model_vars
+        if reporters is None:
+            reporters = list(model_vars)
+            sections.extend(tempfile.TemporaryFile(dir=section_dir) for _ in reporters)
+        elif set(model_vars) != set(reporters):
+            raise ValueError("run %d reports %s, expected %s" % (i, sorted(model_vars), sorted(reporters)))
+        run_steps = 0
+        for name, section in zip(reporters, sections):
+            values = model_vars[name]
+            if len(values) > num_steps:
+                raise ValueError("run %d has %d steps of %s, more than num_steps=%d"
+                                 % (i, len(values), name, num_steps))
+            record.fill(np.nan)
+            record[:len(values)] = values
+            section.write(record.tobytes())
+            run_steps = max(run_steps, len(values))
+        rows.append(_extract_row(model, seed, run_steps))
+    if seeds is not None and len(rows) != len(seeds):
+        raise ValueError("got %d models but %d seeds" % (len(rows), len(seeds)))
+    return rows, reporters or []
+
+
+def _assemble_archive(f, rows, reporters, num_steps, sections):
+    """ Write the magic, the aligned reporter columns, the run index and the footer. """
+    f.write(ARCHIVE_MAGIC)
+    offset = ARCHIVE_ALIGNMENT
+    column_nbytes = len(rows) * num_steps * COLUMN_DTYPE.itemsize
+    column_offsets = []
+    for section in sections:
+        column_offsets.append(offset)
+        f.seek(offset)
+        section.seek(0)
+        shutil.copyfileobj(section, f)
+        offset = _align(offset + column_nbytes)
+
+    model_type_width = max([len(row[0]) for row in rows] or [1])
+    index = np.array(rows, dtype=_index_dtype(model_type_width))
+    f.seek(offset)
+    f.write(index.tobytes())
+    footer = {'num_runs': len(rows), 'num_steps': num_steps, 'reporters': reporters,
+              'column_offsets': column_offsets, 'model_type_width': model_type_width, 'index_offset': offset}
+    footer_bytes = json.dumps(footer).encode('utf-8')
+    f.write(footer_bytes)
+    f.write(_FOOTER_TAIL.pack(len(footer_bytes), ARCHIVE_MAGIC))
+
+
+class RunArchive(object):
+    """
+    A read-only, memory-mapped view of an archive written by write_archive.
+    The run index and every reporter column are mapped from the file without copying.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            file_size = f.tell()
+            f.seek(0)
+            if file_size < ARCHIVE_ALIGNMENT + _FOOTER_TAIL.size or f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError("%s is not a CommerceModel run archive" % path)
+            f.seek(-_FOOTER_TAIL.size, 2)
+            footer_len, magic = _FOOTER_TAIL.unpack(f.read(_FOOTER_TAIL.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError("%s is not a complete CommerceModel run archive" % path)
+            f.seek(-_FOOTER_TAIL.size - footer_len, 2)
+            footer = json.loads(f.read(footer_len).decode('utf-8'))
+        self.num_runs = footer['num_runs']
+        self.num_steps = footer['num_steps']
+        self.reporters = footer['reporters']
+        self.index = self.__memmap(footer['index_offset'], _index_dtype(footer['model_type_width']),
+                                   (self.num_runs,))
+        self.__columns = {}
+        for name, column_offset in zip(self.reporters, footer['column_offsets']):
+            self.__columns[name] = self.__memmap(column_offset, COLUMN_DTYPE, (self.num_runs, self.num_steps))
+
+    def __memmap(self, offset, dtype, shape):
+        """ Map a section of the archive file, empty sections are returned as empty arrays. """
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    def __len__(self):
+        return self.num_runs
+
+    def column(self, name):
+        """ Return the memory-mapped (num_runs, num_steps) array of a reporter.
+
+        Args:
+            name: DataCollector中model_reporters的名称
+
+        """
+        if name not in self.__columns:
+            raise KeyError("Unknown reporter: %s" % name)
+        return self.__columns[name]
+
+    def select(self, **criteria):
+        """ Return the indices of runs whose metadata matches all given criteria, e.g.
+        archive.select(model_type="China", num_consumer_agents=50).
+
+        Args:
+            criteria: 索引字段名 => 取值，取值为list/tuple/set时匹配其中任意一个；
+                basket_size为None的运行以-1匹配
+
+        """
+        mask = np.ones(self.num_runs, dtype=bool)
+        for field, value in criteria.items():
+            if field not in self.index.dtype.names:
+                raise KeyError("Unknown index field: %s" % field)
+            if isinstance(value, (list, tuple, set)):
+                mask &= np.isin(self.index[field], list(value))
+            else:
+                mask &= self.index[field] == value
+        return np.flatnonzero(mask)
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def validate_basket_size(basket_size):
+    """ Raise ValueError unless basket_size is None or a positive integer. """
+    if basket_size is None:
+        return
+    if isinstance(basket_size, bool) or not isinstance(basket_size, (int, np.integer)) or basket_size < 1:
+        raise ValueError("basket_size must be None or an integer >= 1, got %r" % (basket_size,))
+
+
+def log_category_preferences(preferences, basket_size, shape=None):
+    """ Validate a consumer category preference matrix and return its log weights.
+    The log weights are computed once and reused by sample_baskets on every step.
+
+    Args:
+        preferences: 消费者产品种类偏好矩阵，shape为(num_consumers, num_categories)，
+            权重必须为有限的非负数
+        basket_size: 每个消费者每轮次(step)购买的产品种类数 k，不能为None
+        shape: 可选的期望shape (num_consumers, num_categories)，不一致时引发ValueError
+
+    Returns:
+        偏好权重的对数矩阵，权重为0的产品种类对应 -inf
+
+    """
+    if basket_size is None:
+        raise ValueError("category_preferences requires basket_size")
+    weights = np.asarray(preferences, dtype=float)
+    if weights.ndim != 2:
+        raise ValueError("category preferences must be a 2-D (num_consumers, num_categories) matrix, "
+                         "got shape %s" % (weights.shape,))
+    if shape is not None and weights.shape != tuple(shape):
+        raise ValueError("category preferences shape %s does not match (num_consumers, num_categories) = %s"
+                         % (weights.shape, tuple(shape)))
+    if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+        raise ValueError("category preferences must be finite and non-negative")
+    # 每个消费者至少需要 k 个偏好权重为正的产品种类，否则购物篮会混入零偏好的产品种类
+    if basket_size < weights.shape[1]:
+        positive_counts = np.count_nonzero(weights > 0, axis=1)
+        if np.any(positive_counts < basket_size):
+            raise ValueError("every consumer needs at least basket_size=%d categories with positive preference, "
+                             "consumer %d has %d" % (basket_size, int(np.argmin(positive_counts)),
+                                                     int(positive_counts.min())))
+    with np.errstate(divide='ignore'):
+        return np.log(weights)
+
+
+def sample_baskets(num_consumers, num_categories, basket_size, log_preferences=None, rng=None):
+    """ Sample a shopping basket of category indices for every Consumer Agent in one batch.
+
+    Args:
+        num_consumers: 消费者数量
+        num_categories: 产品种类数量
+        basket_size: 每个消费者每轮次(step)购买的产品种类数 k
+        log_preferences: 可选的由log_category_preferences得到的偏好对数矩阵，
+            shape必须为(num_consumers, num_categories)；为None时均匀抽样
+        rng: numpy.random.Generator，为None时新建一个未设定种子的Generator
+
+    Returns:
+        shape为(num_consumers, min(k, num_categories))的产品种类下标矩阵，每行内下标互不重复
+
+    """
+    if log_preferences is not None and log_preferences.shape != (num_consumers, num_categories):
+        raise ValueError("category preferences shape %s does not match (num_consumers, num_categories) = %s"
+                         % (log_preferences.shape, (num_consumers, num_categories)))
+    if basket_size >= num_categories:
+        return np.tile(np.arange(num_categories), (num_consumers, 1))
+    if rng is None:
+        rng = np.random.default_rng()
+    if log_preferences is None:
+        keys = rng.random((num_consumers, num_categories))
+    else:
+        # Gumbel-top-k: 按偏好权重进行不放回抽样
+        keys = log_preferences + rng.gumbel(size=(num_consumers, num_categories))
+    return np.argpartition(-keys, basket_size - 1, axis=1)[:, :basket_size]
+
+
+def basket_weight(num_categories, basket_size):
+    """ Return the demand weight of one purchase, so that a consumer buying from k categories
+    contributes the same total demand as traversing all categories.
+    """
+    if basket_size is None or basket_size >= num_categories:
+        return 1
+    return num_categories / basket_size
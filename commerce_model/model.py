@@ -1,10 +1,13 @@
 from enum import Enum
 from random import choice, random
 
+import numpy as np
 from mesa import Agent, Model
 from mesa.datacollection import DataCollector
 from mesa.time import RandomActivation
 
+from .basket import basket_weight, log_category_preferences, sample_baskets, validate_basket_size
+
 
 def compute_offline_retailer_num(model):
     """ Compute the number of Offline Retailer Agents after every step. """
@@ -49,7 +52,17 @@ class CommerceModel(Model):
     settled_shop_policy = [CommerceType.platform_commerce, CommerceType.online_retailer, CommerceType.offline_retailer]
 
     def __init__(self, model_type="China", num_consumer_agents=50, num_category_agents=100, num_offline_retailer_agents=100,
-                 num_online_retailer_agents=90, num_platform_e_commerce_agents=40, num_settled_shop_agents=200):
+                 num_online_retailer_agents=90, num_platform_e_commerce_agents=40, num_settled_shop_agents=200,
+                 basket_size=None, category_preferences=None, seed=None):
+        """
+        parameter list:
+            basket_size => 每个消费者每轮次购买的产品种类数 k(>=1)，为None时遍历全部产品种类
+            category_preferences => 消费者产品种类偏好矩阵，shape为(消费者数量, 产品种类数量)，
+                                    权重为有限非负数，且每行至少有 k 个正权重；需要同时指定basket_size，
+                                    为None时均匀抽样
+            seed => 随机种子，用于Mesa的self.random及购物篮抽样的self.np_random
+        """
+        validate_basket_size(basket_size)
         self.model_type = model_type
         self.num_consumer_agents = num_consumer_agents
         self.num_category_agents = num_category_agents
@@ -57,6 +70,15 @@ class CommerceModel(Model):
         self.num_online_retailer_agents = num_online_retailer_agents
         self.num_platform_e_commerce_agents = num_platform_e_commerce_agents
         self.num_settled_shop_agents = num_settled_shop_agents
+        self.basket_size = basket_size
+        self.category_preferences = category_preferences
+        self.category_log_preferences = None
+        if category_preferences is not None:
+            self.category_log_preferences = log_category_preferences(
+                category_preferences, basket_size, (num_consumer_agents, num_category_agents))
+        self.np_random = np.random.default_rng(seed)
+        self.consumer_baskets = {}
+        self.basket_weight = 1
         self.running = True
 
         self.category_schedule = RandomActivation(self)
@@ -192,6 +214,26 @@ class CommerceModel(Model):
         e_commerce_agent.add_product(product)
         category_agent.add_commerce_agent(e_commerce_agent)
 
+    def __sample_consumer_baskets(self):
+        """ 为所有消费者批量抽取本轮次(step)的购物篮，并计算需求权重 """
+        category_agents = self.category_schedule.agents
+        consumer_agents = self.consumer_schedule.agents
+        if self.basket_size is None or self.basket_size >= len(category_agents):
+            self.consumer_baskets = {}
+            self.basket_weight = 1
+            return
+        # 购物篮按调度器中的位置与消费者对应，sample_baskets会校验偏好矩阵的shape
+        baskets = sample_baskets(len(consumer_agents), len(category_agents), self.basket_size,
+                                 self.category_log_preferences, self.np_random)
+        self.consumer_baskets = {consumer_agent.unique_id: [category_agents[j] for j in basket]
+                                 for consumer_agent, basket in zip(consumer_agents, baskets)}
+        # 每个消费者只购买 k 个产品种类，按 全部种类数/k 加权，使总需求与遍历全部种类时可比
+        self.basket_weight = basket_weight(len(category_agents), self.basket_size)
+
+    def get_consumer_basket(self, consumer_agent):
+        """ Return the Category Agents which the Consumer Agent purchases from in this step. """
+        return self.consumer_baskets.get(consumer_agent.unique_id, self.category_schedule.agents)
+
     def __clear_schedule_agents(self):
         """ After every step, clear the original data and init the params."""
         for offline_retailer in self.offline_retailer_schedule.agents:
@@ -209,6 +251,8 @@ class CommerceModel(Model):
             self.__clear_schedule_agents()
         # all E-Commerce Agents randomly purchase products from all Category Agents.
         self.__commerce_purchase()
+        # all Consumer Agents sample their shopping baskets in one batch
+        self.__sample_consumer_baskets()
         # all Consumer Agents randomly purchase products from E-Commerce Agents
         self.consumer_schedule.step()
         # After Consumer Agents purchase products, all E-Commerce Agents
@@ -304,12 +348,13 @@ class ConsumerAgent(Agent):
         return utility
 
     def step(self):
-        """When starting a step, the Consumer Agent traversals every Category Agent from Category Agents,
+        """When starting a step, the Consumer Agent traversals every Category Agent in its shopping basket,
         then choose one E-Commerce Agent from the Category Agent for purchasing product.
         One Category Agent responses to at least one or manny E-Commerce Agents.
+        Without a basket model, the shopping basket contains all Category Agents.
 
         """
-        for category_agent in self.model.category_schedule.agents:
+        for category_agent in self.model.get_consumer_basket(self):
             opt_utility = 0
             opt_product = None
             opt_e_commerce_agent = None
@@ -321,7 +366,7 @@ class ConsumerAgent(Agent):
                         opt_utility = utility
                         opt_product = product
                         opt_e_commerce_agent = e_commerce_agent
-            opt_product.product_num += 1
+            opt_product.product_num += self.model.basket_weight
 
 
 class CategoryAgent(Agent):
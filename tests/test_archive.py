@@ -0,0 +1,142 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from commerce_model.archive import RunArchive, write_archive
+
+
+def make_run(model_type="China", num_consumer_agents=50, steps=3, basket_size=None, seed=None):
+    """ A stand-in for a finished CommerceModel run with two model reporters. """
+    model_vars = {
+        "num_offline_retailer_agents": [100 - i for i in range(steps)],
+        "num_settled_shop_agents": [200 + 2 * i for i in range(steps)],
+    }
+    return SimpleNamespace(model_type=model_type, num_consumer_agents=num_consumer_agents,
+                           num_category_agents=100, num_offline_retailer_agents=100,
+                           num_online_retailer_agents=90, num_platform_e_commerce_agents=40,
+                           num_settled_shop_agents=200, basket_size=basket_size, _seed=seed,
+                           datacollector=SimpleNamespace(model_vars=model_vars))
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = str(tmp_path / "runs.arc")
+    runs = [make_run("China", 50, 3), make_run("American", 60, 5, basket_size=4), make_run("China", 60, 4)]
+    write_archive(path, (run for run in runs), num_steps=5, seeds=[1, 2, 3])
+    return path
+
+
+def test_round_trip(archive_path):
+    archive = RunArchive(archive_path)
+    assert len(archive) == 3
+    assert archive.num_steps == 5
+    assert archive.reporters == ["num_offline_retailer_agents", "num_settled_shop_agents"]
+    assert list(archive.index["model_type"]) == ["China", "American", "China"]
+    assert list(archive.index["seed"]) == [1, 2, 3]
+    assert list(archive.index["basket_size"]) == [-1, 4, -1]
+    assert list(archive.index["num_steps"]) == [3, 5, 4]
+    np.testing.assert_array_equal(archive.column("num_settled_shop_agents")[1], [200, 202, 204, 206, 208])
+
+
+def test_nan_padding(archive_path):
+    column = RunArchive(archive_path).column("num_offline_retailer_agents")
+    assert column.shape == (3, 5)
+    np.testing.assert_array_equal(column[0, :3], [100, 99, 98])
+    assert np.isnan(column[0, 3:]).all()
+    assert np.isnan(column[2, 4])
+
+
+def test_column_is_contiguous_read_only_memmap(archive_path):
+    archive = RunArchive(archive_path)
+    first = archive.column("num_offline_retailer_agents")
+    second = archive.column("num_settled_shop_agents")
+    for column in (first, second):
+        assert isinstance(column, np.memmap)
+        assert not column.flags.writeable
+        assert column.flags['C_CONTIGUOUS']
+        assert column.strides == (5 * 8, 8)
+        assert column.offset % 64 == 0
+    # 每个reporter占用各自独立的连续区段
+    assert second.offset >= first.offset + first.nbytes
+    with pytest.raises(KeyError):
+        archive.column("unknown")
+
+
+def test_select(archive_path):
+    archive = RunArchive(archive_path)
+    assert list(archive.select(model_type="China")) == [0, 2]
+    assert list(archive.select(num_consumer_agents=[60])) == [1, 2]
+    assert list(archive.select(model_type="China", num_consumer_agents=(50, 70))) == [0]
+    assert list(archive.select(basket_size=-1)) == [0, 2]
+    assert list(archive.select()) == [0, 1, 2]
+    with pytest.raises(KeyError):
+        archive.select(unknown=1)
+
+
+def test_empty_archive(tmp_path):
+    path = str(tmp_path / "empty.arc")
+    write_archive(path, [], num_steps=10)
+    archive = RunArchive(path)
+    assert len(archive) == 0
+    assert archive.reporters == []
+    assert len(archive.select(model_type="China")) == 0
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "bad.arc"
+    path.write_bytes(b"not an archive" * 10)
+    with pytest.raises(ValueError):
+        RunArchive(str(path))
+
+
+def test_long_model_type_is_not_truncated(tmp_path):
+    path = str(tmp_path / "long.arc")
+    write_archive(path, [make_run("AVeryLongModelTypeNameX"), make_run("China")], num_steps=3)
+    archive = RunArchive(path)
+    assert list(archive.select(model_type="AVeryLongModelTypeNameX")) == [0]
+
+
+def test_seeds_default_to_mesa_seed(tmp_path):
+    path = str(tmp_path / "seeds.arc")
+    write_archive(path, [make_run(seed=7), make_run(seed=None), make_run(seed="abc")], num_steps=3)
+    assert list(RunArchive(path).index["seed"]) == [7, -1, -1]
+
+
+@pytest.mark.parametrize("seeds", [[1], [1, 2, 3, 4]])
+def test_seeds_length_mismatch(tmp_path, seeds):
+    with pytest.raises(ValueError):
+        write_archive(str(tmp_path / "seeds.arc"), [make_run(), make_run(), make_run()], num_steps=3, seeds=seeds)
+
+
+def test_run_longer_than_num_steps(tmp_path):
+    with pytest.raises(ValueError):
+        write_archive(str(tmp_path / "long.arc"), [make_run(steps=6)], num_steps=5)
+
+
+def test_mismatched_reporters(tmp_path):
+    other = make_run()
+    other.datacollector.model_vars["extra"] = [1, 2, 3]
+    with pytest.raises(ValueError):
+        write_archive(str(tmp_path / "mixed.arc"), [make_run(), other], num_steps=3)
+
+
+def test_failed_write_keeps_existing_archive(archive_path):
+    with open(archive_path, 'rb') as f:
+        original = f.read()
+    with pytest.raises(ValueError):
+        write_archive(archive_path, [make_run(), make_run(steps=6)], num_steps=5)
+    with pytest.raises(ValueError):
+        write_archive(archive_path, [make_run(), make_run()], num_steps=5, seeds=[1])
+    with open(archive_path, 'rb') as f:
+        assert f.read() == original
+    assert not os.path.exists(archive_path + '.tmp')
+    assert len(RunArchive(archive_path)) == 3
+
+
+def test_write_replaces_existing_archive(archive_path):
+    write_archive(archive_path, [make_run("American")], num_steps=3)
+    archive = RunArchive(archive_path)
+    assert list(archive.index["model_type"]) == ["American"]
+    assert not os.path.exists(archive_path + '.tmp')
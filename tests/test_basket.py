@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from commerce_model.basket import basket_weight, log_category_preferences, sample_baskets, validate_basket_size
+
+
+def test_sample_baskets_shape_and_unique():
+    baskets = sample_baskets(200, 30, 5, rng=np.random.default_rng(0))
+    assert baskets.shape == (200, 5)
+    assert baskets.min() >= 0 and baskets.max() < 30
+    assert all(len(set(basket)) == 5 for basket in baskets)
+
+
+def test_sample_baskets_full_traversal():
+    baskets = sample_baskets(4, 6, 6, rng=np.random.default_rng(0))
+    assert (baskets == np.arange(6)).all()
+    baskets = sample_baskets(4, 6, 10, rng=np.random.default_rng(0))
+    assert (baskets == np.arange(6)).all()
+
+
+def test_sample_baskets_reproducible_with_seed():
+    first = sample_baskets(50, 20, 3, rng=np.random.default_rng(42))
+    second = sample_baskets(50, 20, 3, rng=np.random.default_rng(42))
+    assert (first == second).all()
+
+
+def test_sample_baskets_preference_masking():
+    preferences = np.zeros((500, 20))
+    preferences[:, 5:9] = [1, 2, 3, 4]
+    log_preferences = log_category_preferences(preferences, 3)
+    baskets = sample_baskets(500, 20, 3, log_preferences, np.random.default_rng(0))
+    assert set(np.unique(baskets)) <= {5, 6, 7, 8}
+    counts = np.bincount(baskets.ravel(), minlength=20)
+    assert counts[8] > counts[5]
+
+
+def test_sample_baskets_preference_shape_mismatch():
+    log_preferences = log_category_preferences(np.ones((3, 10)), 2)
+    with pytest.raises(ValueError):
+        sample_baskets(3, 5, 2, log_preferences, np.random.default_rng(0))
+    with pytest.raises(ValueError):
+        sample_baskets(4, 10, 2, log_preferences, np.random.default_rng(0))
+
+
+@pytest.mark.parametrize("preferences", [
+    [[1.0, -1.0, 1.0]],
+    [[1.0, np.nan, 1.0]],
+    [[1.0, np.inf, 1.0]],
+    [1.0, 1.0, 1.0],
+])
+def test_log_category_preferences_rejects_invalid_weights(preferences):
+    with pytest.raises(ValueError):
+        log_category_preferences(preferences, 1)
+
+
+def test_log_category_preferences_requires_basket_size_positive_weights():
+    preferences = np.zeros((2, 10))
+    preferences[:, 0] = 1
+    with pytest.raises(ValueError):
+        log_category_preferences(preferences, 3)
+    # 购物篮覆盖全部产品种类时不需要足够的正权重
+    log_category_preferences(preferences, 10)
+
+
+def test_log_category_preferences_requires_basket_size():
+    with pytest.raises(ValueError):
+        log_category_preferences(np.ones((3, 5)), None)
+
+
+def test_log_category_preferences_checks_shape():
+    log_category_preferences(np.ones((3, 5)), 2, (3, 5))
+    with pytest.raises(ValueError):
+        log_category_preferences(np.ones((3, 5)), 2, (3, 10))
+    with pytest.raises(ValueError):
+        log_category_preferences(np.ones((3, 5)), 2, (4, 5))
+
+
+@pytest.mark.parametrize("basket_size", [0, -1, 1.5, "3", True])
+def test_validate_basket_size_rejects_invalid(basket_size):
+    with pytest.raises(ValueError):
+        validate_basket_size(basket_size)
+
+
+def test_validate_basket_size_accepts_valid():
+    validate_basket_size(None)
+    validate_basket_size(1)
+    validate_basket_size(np.int64(4))
+
+
+def test_weighted_totals_match_full_traversal():
+    num_consumers, num_categories, basket_size = 4000, 25, 5
+    baskets = sample_baskets(num_consumers, num_categories, basket_size, rng=np.random.default_rng(0))
+    weight = basket_weight(num_categories, basket_size)
+    demand = np.bincount(baskets.ravel(), minlength=num_categories) * weight
+    full_demand = np.full(num_categories, num_consumers)
+    assert demand.sum() == pytest.approx(full_demand.sum())
+    assert demand == pytest.approx(full_demand, rel=0.15)
+
+
+def test_basket_weight_without_basket():
+    assert basket_weight(25, None) == 1
+    assert basket_weight(25, 25) == 1
+    assert basket_weight(25, 40) == 1